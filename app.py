@@ -13,27 +13,38 @@ warnings.filterwarnings("ignore", message="pkg_resources is deprecated as an API
 # -----------------------------
 # Normal Imports
 # -----------------------------
-import base64
+import atexit
 import io
 import logging
+import threading
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date, timezone
-from typing import Optional, Tuple
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
 
 import cv2
+from cachetools import TTLCache
 import numpy as np
-from fer.fer import FER
+import pybase64
+from PIL import Image
+from service_streamer import ThreadedStreamer
 from flask import (
     Flask, render_template, request, redirect,
-    url_for, flash, jsonify, session, send_file
+    url_for, flash, jsonify, session, send_file, g
 )
 from flask_login import (
     LoginManager, login_user, login_required,
     logout_user, current_user
 )
+from sqlalchemy import desc, func
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from config import Config
 from models import db, User, EmotionLog, WeeklyGoal
+from emotion_labels import EMOTION_LABELS
 from report_generator import generate_weekly_report_pdf
 
 
@@ -50,6 +61,18 @@ login_manager.login_view = "login"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("emotion-tracker")
 
+# -----------------------------
+# Request Clock
+# -----------------------------
+# One timestamp per request keeps every query in it on the same time boundary.
+_TWO_MIN = timedelta(seconds=120)
+
+
+@app.before_request
+def _set_now():
+    g.now = datetime.now(timezone.utc)
+
+
 # -----------------------------
 # User Loader
 # -----------------------------
@@ -68,93 +91,420 @@ with app.app_context():
 # -----------------------------
 # Load FER Model (Single Instance)
 # -----------------------------
-_fer_model = None
-
-
-def load_emotion_model_once():
-    global _fer_model
-    if _fer_model is None:
-        _fer_model = FER(mtcnn=True)
+# Built once at import time so requests use it without re-checking it.
+# Neither TensorFlow nor onnxruntime is fork-safe once a model is loaded, and
+# the streamer/executor/flusher threads below don't survive fork() either, so
+# the app must be imported in the worker process itself (no preload_app).
+# Each backend is imported only in its own branch, so the ONNX backend never
+# loads TensorFlow and the FER backend never loads onnxruntime.
+def _build_emotion_model():
+    if app.config["EMOTION_BACKEND"] == "onnx":
+        from onnx_emotion import OnnxEmotionDetector
+        model = OnnxEmotionDetector(
+            app.config["ONNX_FACE_MODEL"],
+            app.config["ONNX_EMOTION_MODEL"],
+            use_haar=app.config["USE_HAAR"]
+        )
+        logger.info("ONNX emotion model loaded successfully")
+    else:
+        from fer.fer import FER
+        # FER's non-MTCNN path is OpenCV's Haar cascade on grayscale
+        model = FER(mtcnn=not app.config["USE_HAAR"])
         logger.info("FER model loaded successfully")
-    return _fer_model
+    return model
 
 
-@app.before_request
-def ensure_models_loaded():
-    if request.path.startswith("/api/detect_emotion"):
-        load_emotion_model_once()
+_fer_model = _build_emotion_model()
 
 
 # -----------------------------
-# Utility: Decode Image
+# Batched Inference (Request Queue)
 # -----------------------------
-def decode_base64_image(data_url: str) -> np.ndarray:
-    if "," in data_url:
-        encoded = data_url.split(",")[1]
-    else:
-        encoded = data_url
-    img_bytes = base64.b64decode(encoded)
-    nparr = np.frombuffer(img_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)  # BGR
-    return img
+STREAMER_BATCH_SIZE = 8
+STREAMER_MAX_LATENCY = 0.05  # seconds to wait for a batch to fill
+
+
+def predict_batch(batch_imgs):
+    """Run FER over a batch of frames stacked by the streamer.
+
+    FER has no batch API, so the frames are looped over inside a single
+    worker call; concurrent requests still share one model invocation
+    window instead of contending for it.
+    """
+    return [_fer_model.detect_emotions(img) for img in batch_imgs]
+
+
+streamer = ThreadedStreamer(
+    predict_batch,
+    batch_size=STREAMER_BATCH_SIZE,
+    max_latency=STREAMER_MAX_LATENCY
+)
 
 
 # -----------------------------
-# Detect Emotion (FER)
+# Buffered EmotionLog Writes
 # -----------------------------
-@app.route("/api/detect_emotion", methods=["POST"])
-def detect_emotion():
+# Detections are queued in memory and bulk inserted every few seconds, so a
+# tracking session costs one commit per flush instead of one per frame.
+LOG_FLUSH_INTERVAL = 2.0  # seconds between background flushes
+LOG_FLUSH_BATCH_SIZE = 100  # flush early once this many rows are queued
+LOG_BUFFER_MAX = 10000  # oldest rows are dropped (and logged) past this
+LOG_FLUSH_MAX_RETRIES = 3  # bulk attempts per batch before saving it row by row
+
+_log_buffer = deque()
+_log_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flush_wakeup = threading.Event()
+# Failed batches as (attempts, rows), kept apart from newly queued rows so each
+# batch counts its own retries. Only touched while holding _flush_lock.
+_retry_batches = deque()
+
+
+def _trim_log_buffer() -> None:
+    """Drop the oldest rows beyond LOG_BUFFER_MAX. Caller holds _log_lock."""
+    dropped = len(_log_buffer) - LOG_BUFFER_MAX
+    if dropped <= 0:
+        return
+    for _ in range(dropped):
+        _log_buffer.popleft()
+    logger.warning("EmotionLog buffer full; dropped %d oldest rows", dropped)
+
+
+def _trim_retry_batches() -> None:
+    """Drop the oldest failed batches beyond LOG_BUFFER_MAX rows. Caller holds _flush_lock."""
+    pending = sum(len(rows) for _, rows in _retry_batches)
+    while pending > LOG_BUFFER_MAX:
+        _, rows = _retry_batches.popleft()
+        pending -= len(rows)
+        logger.warning("EmotionLog retry queue full; dropped %d oldest rows", len(rows))
+
+
+def queue_emotion_log(emo_log: EmotionLog) -> None:
+    with _log_lock:
+        _log_buffer.append(emo_log)
+        _trim_log_buffer()
+        full = len(_log_buffer) >= LOG_FLUSH_BATCH_SIZE
+    if full:
+        _flush_wakeup.set()
+
+
+def _save_rows(rows) -> Optional[Exception]:
+    """Bulk insert ``rows`` in one commit; returns the error if it failed."""
     try:
-        data = request.get_json(force=True)
-        img_data = data.get("image")
+        db.session.bulk_save_objects(rows)
+        db.session.commit()
+        return None
+    except Exception as e:
+        db.session.rollback()
+        return e
+
 
-        if not img_data:
-            return jsonify({"error": "No image received"}), 400
+def _save_rows_individually(rows) -> None:
+    """Last resort for a batch that keeps failing: only the bad rows are lost."""
+    failed = sum(_save_rows([row]) is not None for row in rows)
+    if failed:
+        logger.error("DB save failed; dropped %d of %d rows", failed, len(rows))
 
-        img = decode_base64_image(img_data)
-        fer = load_emotion_model_once()
 
-        faces = fer.detect_emotions(img)
+def flush_emotion_logs() -> None:
+    """Write all buffered EmotionLog rows. Must run inside an app context.
+
+    A batch whose commit fails is retried on later flushes. After
+    LOG_FLUSH_MAX_RETRIES failed attempts its rows are saved one by one, so a
+    single bad row doesn't take the rest of the batch with it.
+    """
+    with _flush_lock:
+        with _log_lock:
+            new_rows = list(_log_buffer)
+            _log_buffer.clear()
+
+        batches = list(_retry_batches)
+        _retry_batches.clear()
+        if new_rows:
+            batches.append((0, new_rows))
+
+        for attempts, rows in batches:
+            error = _save_rows(rows)
+            if error is None:
+                continue
+
+            attempts += 1
+            if attempts >= LOG_FLUSH_MAX_RETRIES:
+                logger.error("DB save failed (%d rows) after %d attempts, saving row by row: %s",
+                             len(rows), attempts, error)
+                _save_rows_individually(rows)
+            else:
+                logger.error("DB save failed (%d rows), will retry: %s", len(rows), error)
+                _retry_batches.append((attempts, rows))
+
+        _trim_retry_batches()
+
+
+def _flush_with_app_context() -> None:
+    with app.app_context():
+        flush_emotion_logs()
+
+
+def _log_flush_loop() -> None:
+    while True:
+        _flush_wakeup.wait(LOG_FLUSH_INTERVAL)
+        _flush_wakeup.clear()
+        _flush_with_app_context()
+
+
+threading.Thread(target=_log_flush_loop, name="emotion-log-flush", daemon=True).start()
+atexit.register(_flush_with_app_context)
+
+
+# -----------------------------
+# Repeated Frame Gate
+# -----------------------------
+# Consecutive frames from a still user are nearly identical. When a frame's
+# dHash is within a few bits of the user's last analysed frame, the previous
+# result is reused instead of running the model again. Entries are not
+# refreshed on a hit, so the model still runs at least once per TTL.
+FRAME_HASH_MAX_DISTANCE = 4  # differing bits out of 64
+FRAME_CACHE_TTL = 10  # seconds; covers one 5s capture interval in main.js
+
+_frame_cache = TTLCache(maxsize=1024, ttl=FRAME_CACHE_TTL)
+_frame_cache_lock = threading.Lock()
+
+
+def dhash(gray: np.ndarray) -> int:
+    """64-bit difference hash of a grayscale frame."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def cached_frame_result(user_id: int, frame_hash: int) -> Optional[Tuple[str, float]]:
+    with _frame_cache_lock:
+        entry = _frame_cache.get(user_id)
+
+    if entry is None:
+        return None
+
+    last_hash, emotion, confidence = entry
+    if bin(last_hash ^ frame_hash).count("1") > FRAME_HASH_MAX_DISTANCE:
+        return None
+    return emotion, confidence
+
+
+def remember_frame_result(user_id: int, frame_hash: int, emotion: str, confidence: float) -> None:
+    with _frame_cache_lock:
+        _frame_cache[user_id] = (frame_hash, emotion, confidence)
+
+# -----------------------------
+# Background Inference Workers
+# -----------------------------
+# detect_emotion only decodes the frame and queues it; the worker pool runs
+# the model and the DB write so HTTP threads are not held for the forward pass.
+INFERENCE_RESULT_TTL = 60  # seconds a result stays available for polling
+# Every task blocks in streamer.predict, so the pool only needs enough threads
+# to fill one batch while the previous one runs.
+INFERENCE_WORKERS = 2 * STREAMER_BATCH_SIZE
+INFERENCE_MAX_PENDING = 4 * STREAMER_BATCH_SIZE  # beyond this, reply 503
+
+executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS)
+# Tasks stay in _pending until their future finishes, then move to _results.
+# Only finished results can expire or be evicted, never queued work.
+_pending = {}
+_results = TTLCache(maxsize=10000, ttl=INFERENCE_RESULT_TTL)
+_results_lock = threading.Lock()
+
+def _record_detection(user_id: Optional[int], emotion: str, confidence: float,
+                      ts: datetime) -> dict:
+    """Queue the EmotionLog row for a detection and build its response payload."""
+    # Save to DB (buffered, written by the flush thread)
+    if user_id is not None:
+        queue_emotion_log(EmotionLog(
+            user_id=user_id,
+            emotion=emotion,
+            confidence=confidence,
+            timestamp=ts
+        ))
+
+    return {
+        "timestamp": ts.isoformat(),
+        "emotion": emotion,
+        "confidence": confidence
+    }
+
+
+def _run_inference(img: np.ndarray, user_id: Optional[int],
+                   frame_hash: Optional[int] = None) -> Tuple[dict, int]:
+    """Run the model on one frame and save the result; returns (payload, status)."""
+    try:
+        faces = streamer.predict([img])[0]
         ts = datetime.now(timezone.utc)
 
         if not faces:
-            return jsonify({
+            return {
                 "timestamp": ts.isoformat(),
                 "emotion": None,
                 "confidence": None,
                 "message": "No face detected"
-            }), 200
+            }, 200
 
         emotions = faces[0]["emotions"]
-        dominant = max(emotions, key=emotions.get)
+        scores = np.fromiter(
+            (emotions[k] for k in EMOTION_LABELS), dtype=np.float64, count=len(EMOTION_LABELS)
+        )
+        dominant = EMOTION_LABELS[int(scores.argmax())]
+        # Read the model's own value so stored confidences aren't re-rounded
         confidence = float(emotions[dominant])
-        dominant = dominant.lower()
-
-        # Save to DB
-        try:
-            emo_log = EmotionLog(
-                user_id=current_user.id if current_user.is_authenticated else None,
-                emotion=dominant,
-                confidence=confidence,
-                timestamp=ts
-            )
-            db.session.add(emo_log)
-            db.session.commit()
-        except Exception as e:
-            logger.error("DB save failed: %s", e)
-            db.session.rollback()
+
+        if user_id is not None and frame_hash is not None:
+            remember_frame_result(user_id, frame_hash, dominant, confidence)
+
+        return _record_detection(user_id, dominant, confidence, ts), 200
+
+    except Exception as e:
+        logger.error("inference error: %s", e)
+        return {"error": "Server error"}, 500
+
+
+def _submit_inference(img: np.ndarray, user_id: Optional[int],
+                      frame_hash: Optional[int]) -> Optional[str]:
+    """Queue a frame for inference; returns its task id, or None when too busy."""
+    task_id = uuid.uuid4().hex
+    with _results_lock:
+        if len(_pending) >= INFERENCE_MAX_PENDING:
+            return None
+        future = executor.submit(_run_inference, img, user_id, frame_hash)
+        _pending[task_id] = (user_id, future)
+
+    future.add_done_callback(lambda _: _finish_inference(task_id))
+    return task_id
+
+
+def _finish_inference(task_id: str) -> None:
+    with _results_lock:
+        entry = _pending.pop(task_id, None)
+        if entry is None or entry[1].cancelled():
+            return
+        user_id, future = entry
+        _results[task_id] = (user_id, future.result())
+
+
+# -----------------------------
+# Utility: Decode Image
+# -----------------------------
+DETECT_MAX_SIDE = 480  # face detection cost grows with pixel count
+# Frames are downscaled to DETECT_MAX_SIDE anyway; only decode at half size
+# when the result still covers it.
+REDUCED_DECODE_MIN_SIDE = 2 * DETECT_MAX_SIDE
+
+
+def decode_image_bytes(buf: bytes) -> np.ndarray:
+    """Decode encoded image bytes to a BGR array.
+
+    Large frames are decoded with IMREAD_REDUCED_COLOR_2, which lets libjpeg
+    downscale in the DCT domain instead of decoding every pixel. Only the
+    header is parsed to read the frame size.
+    """
+    flags = cv2.IMREAD_COLOR
+    try:
+        with Image.open(io.BytesIO(buf)) as header:
+            if max(header.size) > REDUCED_DECODE_MIN_SIDE:
+                flags = cv2.IMREAD_REDUCED_COLOR_2
+    except Exception:
+        pass  # let imdecode decide whether the bytes are usable
+
+    return cv2.imdecode(np.frombuffer(buf, np.uint8), flags)  # BGR
+
+
+def downscale_frame(img: np.ndarray, max_side: int = DETECT_MAX_SIDE) -> np.ndarray:
+    """Shrink the frame so its longest side is at most ``max_side`` pixels."""
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return img
+
+
+def decode_base64_image(data_url: str) -> np.ndarray:
+    raw = data_url.encode("ascii")
+    _, _, encoded = raw.partition(b",")
+    img_bytes = pybase64.b64decode(encoded or raw, validate=False)
+    return decode_image_bytes(img_bytes)
+
+
+# -----------------------------
+# Detect Emotion (FER)
+# -----------------------------
+@app.route("/api/detect_emotion", methods=["POST"])
+def detect_emotion():
+    try:
+        if "image" in request.files:
+            # Raw JPEG upload (multipart/form-data)
+            img_bytes = request.files["image"].read()
+            if not img_bytes:
+                return jsonify({"error": "No image received"}), 400
+            img = decode_image_bytes(img_bytes)
+        else:
+            # Legacy base64 data URL in a JSON body
+            data = request.get_json(force=True)
+            img_data = data.get("image")
+
+            if not img_data:
+                return jsonify({"error": "No image received"}), 400
+
+            img = decode_base64_image(img_data)
+
+        if img is None:
+            return jsonify({"error": "Invalid image"}), 400
+
+        # Face boxes are not returned to the client, so the original size isn't kept
+        img = downscale_frame(img)
+
+        user_id = current_user.id if current_user.is_authenticated else None
+
+        frame_hash = None
+        if user_id is not None:
+            frame_hash = dhash(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+            cached = cached_frame_result(user_id, frame_hash)
+            if cached is not None:
+                emotion, confidence = cached
+                return jsonify(_record_detection(
+                    user_id, emotion, confidence, g.now
+                ))
+
+        task_id = _submit_inference(img, user_id, frame_hash)
+        if task_id is None:
+            return jsonify({"error": "Server busy, try again"}), 503
 
         return jsonify({
-            "timestamp": ts.isoformat(),
-            "emotion": dominant,
-            "confidence": confidence
-        })
+            "task_id": task_id,
+            "status": "pending",
+            "result_url": url_for("detect_result", task_id=task_id)
+        }), 202
 
     except Exception as e:
         logger.error("detect_emotion error: %s", e)
         return jsonify({"error": "Server error"}), 500
 
 
+@app.route("/api/detect_result/<task_id>")
+def detect_result(task_id):
+    user_id = current_user.id if current_user.is_authenticated else None
+
+    with _results_lock:
+        pending = _pending.get(task_id)
+        done = _results.get(task_id) if pending is None else None
+        if done is not None and done[0] == user_id:
+            _results.pop(task_id, None)
+
+    if pending is not None and pending[0] == user_id:
+        return jsonify({"task_id": task_id, "status": "pending"}), 202
+
+    if done is None or done[0] != user_id:
+        return jsonify({"error": "Unknown or expired task"}), 404
+
+    payload, status = done[1]
+    return jsonify(payload), status
+
+
 # -----------------------------
 # Summary (Last 2 Minutes)
 # -----------------------------
@@ -162,30 +512,28 @@ def detect_emotion():
 @login_required
 def summary_2min():
     try:
-        now = datetime.now(timezone.utc)
-        two_min = now - timedelta(seconds=120)
+        flush_emotion_logs()
+        two_min = g.now - _TWO_MIN
 
-        logs = EmotionLog.query.filter(
+        counts = db.session.query(
+            EmotionLog.emotion, func.count().label("c")
+        ).filter(
             EmotionLog.user_id == current_user.id,
             EmotionLog.timestamp >= two_min
-        ).all()
+        ).group_by(EmotionLog.emotion).all()
 
-        if not logs:
+        if not counts:
             return jsonify({"total": 0, "summary": []})
 
-        from collections import Counter
-
-        emotions = [log.emotion for log in logs]
-        total = len(emotions)
-        counts = Counter(emotions)
+        total = sum(cnt for _, cnt in counts)
 
         summary = [{
             "emotion": emo,
             "count": cnt,
             "percentage": (cnt / total) * 100
-        } for emo, cnt in counts.items()]
+        } for emo, cnt in counts]
 
-        summary.sort(key=lambda x: x["count"], reverse=True)
+        summary.sort(key=itemgetter("count"), reverse=True)
 
         return jsonify({"total": total, "summary": summary})
 
@@ -206,79 +554,143 @@ def save_dashboard_summary():
     return jsonify({"message": "Summary saved"})
 
 
+# -----------------------------
+# Weekly Goal Lookup (Cached)
+# -----------------------------
+# Goals change rarely, so lookups are memoized on flask.g for the request and
+# in a short-lived process cache across requests.
+GOAL_CACHE_TTL = 30  # seconds
+
+_goal_cache = TTLCache(maxsize=1024, ttl=GOAL_CACHE_TTL)
+_goal_cache_lock = threading.Lock()
+_NO_ENTRY = object()
+
+
+def current_week_start() -> date:
+    """Monday of the current week."""
+    today = date.today()
+    return today - timedelta(days=today.weekday())
+
+
+def get_weekly_goal(user_id: int, week_start: date) -> Optional[WeeklyGoal]:
+    key = (user_id, week_start)
+    memo = g.setdefault("weekly_goals", {})
+    if key in memo:
+        return memo[key]
+
+    with _goal_cache_lock:
+        goal = _goal_cache.get(key, _NO_ENTRY)
+
+    if goal is _NO_ENTRY:
+        goal = WeeklyGoal.query.filter_by(
+            user_id=user_id,
+            week_start=week_start
+        ).first()
+        if goal is not None:
+            # Keep the cached copy usable after this request's session closes
+            db.session.expunge(goal)
+        with _goal_cache_lock:
+            _goal_cache[key] = goal
+
+    memo[key] = goal
+    return goal
+
+# -----------------------------
+# Recommendation Suggestions
+# -----------------------------
+_SUGGESTIONS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "happy": (
+        "Write down 3 things you're grateful for.",
+        "Share positivity by messaging someone you appreciate.",
+        "Do a quick joyful activity like dancing or listening to music."
+    ),
+    "sad": (
+        "Talk to a friend or someone you trust.",
+        "Write your emotions in a journal.",
+        "Watch something uplifting or calming."
+    ),
+    "angry": (
+        "Take 5–10 deep breaths slowly.",
+        "Go for a short walk to release frustration.",
+        "Step away from the situation temporarily."
+    ),
+    "fear": (
+        "Practice slow breathing for 60 seconds.",
+        "Remind yourself what is under your control.",
+        "Talk to someone supportive to reduce anxiety."
+    ),
+    "neutral": (
+        "Take a short mindful walk.",
+        "Drink water and stretch your body.",
+        "Plan the next task with clarity."
+    ),
+    "surprise": (
+        "Pause and take a moment to process the situation.",
+        "Identify whether the surprise is good or bad.",
+        "Write down how this surprise may affect your goals."
+    )
+})
+
+# Pre-formatted bullet lists, built once at import
+_BULLETS: Mapping[str, str] = MappingProxyType({
+    emotion: "\n• " + "\n• ".join(items)
+    for emotion, items in _SUGGESTIONS.items()
+})
+
+
 # -----------------------------
 # Recommendation Helper FIXED
 # -----------------------------
 def get_last_emotion():
     """Return the latest saved emotion for the current user."""
     try:
+        flush_emotion_logs()
         latest = EmotionLog.query.filter_by(
             user_id=current_user.id
-        ).order_by(EmotionLog.timestamp.desc()).first()
+        ).order_by(EmotionLog.timestamp.desc()).with_entities(EmotionLog.emotion).first()
 
         if latest:
-            return latest.emotion
+            return latest[0]
 
         return None
     except Exception as e:
         logger.error("Failed to fetch last emotion: %s", e)
         return None
 
-def build_recommendation(logs, goal=None):
-    """Used ONLY for PDF report generation."""
+def _dominant_emotion_since(user_id: int, since: datetime) -> Optional[str]:
+    """Most frequent emotion logged by the user since ``since``, counted in SQL."""
+    row = db.session.query(
+        EmotionLog.emotion, func.count().label("c")
+    ).filter(
+        EmotionLog.user_id == user_id,
+        EmotionLog.timestamp >= since
+    ).group_by(EmotionLog.emotion).order_by(desc("c")).first()
+
+    return row[0].lower() if row else None
+
+
+def build_recommendation(logs, goal=None, dominant=None):
+    """Used ONLY for PDF report generation.
+
+    Pass ``dominant`` when the caller already counted the whole window;
+    ``logs`` may then be just the rows shown in the report.
+    """
 
     if not logs:
         return "No emotion data available."
 
     # 1. Find dominant emotion from logs (same as summary)
-    from collections import Counter
-    emotions = [log.emotion.lower() for log in logs]
-    dominant = Counter(emotions).most_common(1)[0][0]
+    if dominant is None:
+        emotions = [log.emotion.lower() for log in logs]
+        dominant = Counter(emotions).most_common(1)[0][0]
 
     # 2. Weekly goal
     target = goal.target_emotion.lower() if goal else None
 
-    # 3. Suggestion list
-    suggestions = {
-        "happy": [
-            "Write down 3 things you're grateful for.",
-            "Share positivity by messaging someone you appreciate.",
-            "Do a quick joyful activity like dancing or listening to music."
-        ],
-        "sad": [
-            "Talk to a friend or someone you trust.",
-            "Write your emotions in a journal.",
-            "Watch something uplifting or calming."
-        ],
-        "angry": [
-            "Take 5–10 deep breaths slowly.",
-            "Go for a short walk to release frustration.",
-            "Step away from the situation temporarily."
-        ],
-        "fear": [
-            "Practice slow breathing for 60 seconds.",
-            "Remind yourself what is under your control.",
-            "Talk to someone supportive to reduce anxiety."
-        ],
-        "neutral": [
-            "Take a short mindful walk.",
-            "Drink water and stretch your body.",
-            "Plan the next task with clarity."
-        ],
-        "surprise": [
-            "Pause and take a moment to process the situation.",
-            "Identify whether the surprise is good or bad.",
-            "Write down how this surprise may affect your goals."
-        ]
-    }
-
-    # 4. Format suggestions
-    if dominant in suggestions:
-        bullet_points = "\n• " + "\n• ".join(suggestions[dominant])
-    else:
-        bullet_points = "\n• No suggestions available."
+    # 3. Format suggestions
+    bullet_points = _BULLETS.get(dominant, "\n• No suggestions available.")
 
-    # 5. Build final recommendation text (PDF-friendly)
+    # 4. Build final recommendation text (PDF-friendly)
     if target:
         if dominant == target:
             return (
@@ -306,62 +718,20 @@ def build_recommendation(logs, goal=None):
 def recommendation():
 
     # STEP 1 — Get last 2 minutes logs
-    now = datetime.now(timezone.utc)
-    two_min = now - timedelta(seconds=120)
+    flush_emotion_logs()
+    two_min = g.now - _TWO_MIN
 
-    logs = EmotionLog.query.filter(
-        EmotionLog.user_id == current_user.id,
-        EmotionLog.timestamp >= two_min
-    ).all()
+    # STEP 2 — Count emotions (dominant one only)
+    dominant = _dominant_emotion_since(current_user.id, two_min)
 
-    if not logs:
+    if dominant is None:
         return {"recommendation": "No emotion data found in the last 2 minutes."}
 
-    # STEP 2 — Count emotions
-    from collections import Counter
-    emotions_list = [log.emotion.lower() for log in logs]
-    dominant = Counter(emotions_list).most_common(1)[0][0]
-
-    # STEP 3 — Suggestion list
-    suggestions = {
-        "happy": [
-            "Write down 3 things you're grateful for.",
-            "Share positivity by messaging someone you appreciate.",
-            "Do a quick joyful activity like dancing or listening to music."
-        ],
-        "sad": [
-            "Talk to a friend or someone you trust.",
-            "Write your emotions in a journal.",
-            "Watch something uplifting or calming."
-        ],
-        "angry": [
-            "Take 5–10 deep breaths slowly.",
-            "Go for a short walk to release frustration.",
-            "Step away from the situation temporarily."
-        ],
-        "fear": [
-            "Practice slow breathing for 60 seconds.",
-            "Remind yourself what is under your control.",
-            "Talk to someone supportive to reduce anxiety."
-        ],
-        "neutral": [
-            "Take a short mindful walk.",
-            "Drink water and stretch your body.",
-            "Plan the next task with clarity."
-        ],
-        "surprise": [
-            "Pause and take a moment to process the situation.",
-            "Identify whether the surprise is good or bad.",
-            "Write down how this surprise may affect your goals."
-        ]
-    }
-
-    if dominant not in suggestions:
+    # STEP 3 — Format output
+    all_suggestions = _BULLETS.get(dominant)
+    if all_suggestions is None:
         return {"recommendation": f"No suggestions available for {dominant}."}
 
-    # STEP 4 — Format output
-    all_suggestions = "\n• " + "\n• ".join(suggestions[dominant])
-
     return {
         "recommendation": f"Based on the last 2 minutes, the dominant emotion is {dominant}.\nHere are your suggestions:{all_suggestions}"
     }
@@ -381,14 +751,10 @@ def index():
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
+    week_start = current_week_start()
     week_end = week_start + timedelta(days=6)
 
-    goal = WeeklyGoal.query.filter_by(
-        user_id=current_user.id,
-        week_start=week_start
-    ).first()
+    goal = get_weekly_goal(current_user.id, week_start)
 
     return render_template("dashboard.html",
                            week_start=week_start,
@@ -399,26 +765,28 @@ def dashboard():
 # -----------------------------
 # PDF Report
 # -----------------------------
+REPORT_TIMELINE_ROWS = 20
+
 @app.route("/report/pdf")
 @login_required
 def report_pdf():
     try:
-        now = datetime.now(timezone.utc)
-        two_min = now - timedelta(seconds=120)
+        flush_emotion_logs()
+        two_min = g.now - _TWO_MIN
 
+        # Only the rows shown in the timeline are loaded
         logs = EmotionLog.query.filter(
             EmotionLog.user_id == current_user.id,
             EmotionLog.timestamp >= two_min
-        ).order_by(EmotionLog.timestamp.desc()).all()
+        ).order_by(EmotionLog.timestamp.desc()).limit(REPORT_TIMELINE_ROWS).all()
 
         if not logs:
             return jsonify({"error": "No logs available to generate report."}), 400
 
-        goal = WeeklyGoal.query.filter_by(user_id=current_user.id).order_by(
-            WeeklyGoal.week_start.desc()
-        ).first()
+        dominant = _dominant_emotion_since(current_user.id, two_min)
+        goal = get_weekly_goal(current_user.id, current_week_start())
 
-        recommendation = build_recommendation(logs, goal)
+        recommendation = build_recommendation(logs, goal, dominant=dominant)
 
         pdf_buffer = generate_weekly_report_pdf(
             current_user, logs, None, None, goal, recommendation
@@ -6,3 +6,11 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or "change-this-secret-key"
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or         "sqlite:///" + os.path.join(BASE_DIR, "emotion_app.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Emotion model backend: "fer" (MTCNN + Keras) or "onnx" (ONNX Runtime)
+    EMOTION_BACKEND = os.environ.get("EMOTION_BACKEND") or "fer"
+    ONNX_FACE_MODEL = os.environ.get("ONNX_FACE_MODEL") or os.path.join(BASE_DIR, "models", "scrfd_500m.onnx")
+    ONNX_EMOTION_MODEL = os.environ.get("ONNX_EMOTION_MODEL") or os.path.join(BASE_DIR, "models", "emotion_mini_xception.onnx")
+
+    # Use OpenCV's Haar cascade on grayscale frames instead of MTCNN / SCRFD
+    USE_HAAR = (os.environ.get("USE_HAAR") or "").lower() in ("1", "true", "yes")
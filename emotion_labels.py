@@ -0,0 +1,5 @@
+# FER2013 class order: the labels and order both FER and the ONNX classifier
+# return. app.py indexes the argmax of a score vector into this tuple, so it
+# is the single definition. Kept free of model imports so either backend can
+# use it without loading the other.
+EMOTION_LABELS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
@@ -0,0 +1,16 @@
+# Run with: gunicorn -c gunicorn.conf.py app:app
+
+# A single process: async detection results, the EmotionLog write buffer and
+# the repeated-frame cache all live in process memory, so every request
+# (including /api/detect_result polls) must reach the same worker.
+# Concurrency comes from threads; inference itself is serialized through the
+# streamer and uses all cores via the model's own intra-op threads.
+workers = 1
+threads = 4
+worker_class = "gthread"
+
+# No preload_app: TensorFlow / onnxruntime are not fork-safe once a model is
+# loaded, so the worker imports the app (and builds the model) itself.
+preload_app = False
+
+timeout = 60
@@ -13,6 +13,8 @@ let _lastShownTimestamp = null;
 
 const CAPTURE_INTERVAL_MS = 5000; // 5 seconds
 const AUTO_STOP_MS = 2 * 60 * 1000; // 2 minutes auto-stop
+const JPEG_QUALITY = 0.7;
+const RESULT_POLL_MS = 250;
 
 // ----------------------------------------------
 // CAMERA SETUP
@@ -73,6 +75,32 @@ function normalizeDetectionResponse(data) {
   return null;
 }
 
+// ----------------------------------------------
+// Helper: encode the current canvas frame as a JPEG Blob
+function canvasToJpegBlob(canvas) {
+  return new Promise((resolve, reject) => {
+    canvas.toBlob(
+      (blob) => (blob ? resolve(blob) : reject(new Error("Canvas encode failed"))),
+      "image/jpeg",
+      JPEG_QUALITY
+    );
+  });
+}
+
+// ----------------------------------------------
+// Helper: detection runs in a background worker; the POST returns 202 with a
+// task id and the result is polled from /api/detect_result/<task_id>.
+function waitForDetection(response) {
+  if (response.status !== 202) return response.json();
+  return response.json().then((task) => pollDetectionResult(task.task_id));
+}
+
+function pollDetectionResult(taskId) {
+  return new Promise((resolve) => setTimeout(resolve, RESULT_POLL_MS))
+    .then(() => fetch(`/api/detect_result/${taskId}`))
+    .then((r) => (r.status === 202 ? pollDetectionResult(taskId) : r.json()));
+}
+
 // ----------------------------------------------
 // CAPTURE FRAME + SEND
 // ----------------------------------------------
@@ -87,14 +115,15 @@ function captureFrameAndSend() {
     canvas.width = video.videoWidth;
     canvas.height = video.videoHeight;
     context.drawImage(video, 0, 0, canvas.width, canvas.height);
-    const dataUrl = canvas.toDataURL("image/jpeg");
 
-    fetch("/api/detect_emotion", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ image: dataUrl }),
-    })
-      .then((r) => r.json())
+    // Send raw JPEG bytes (multipart) instead of a base64 data URL
+    canvasToJpegBlob(canvas)
+      .then((blob) => {
+        const form = new FormData();
+        form.append("image", blob, "frame.jpg");
+        return fetch("/api/detect_emotion", { method: "POST", body: form });
+      })
+      .then(waitForDetection)
       .then((raw) => {
         if (!raw) {
           console.warn("Empty response from /api/detect_emotion");
@@ -15,11 +15,14 @@ class User(UserMixin, db.Model):
     goals = db.relationship("WeeklyGoal", backref="user", lazy=True)
 
 class EmotionLog(db.Model):
+    # Per-user time-window queries (summary, recommendation, report) hit this index
+    __table_args__ = (db.Index("ix_emolog_user_ts", "user_id", "timestamp"),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     emotion = db.Column(db.String(32), nullable=False)
     confidence = db.Column(db.Float, nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class WeeklyGoal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,154 @@
+import os
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from emotion_labels import EMOTION_LABELS
+
+
+DET_INPUT_SIZE = 320
+DET_STRIDES = (8, 16, 32)
+DET_NUM_ANCHORS = 2
+DET_SCORE_THRESHOLD = 0.5
+
+
+def _make_session(model_path):
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = os.cpu_count() or 1
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(
+        model_path,
+        sess_options=opts,
+        providers=["CPUExecutionProvider"]
+    )
+
+
+def _softmax(x):
+    e = np.exp(x - x.max())
+    return e / e.sum()
+
+
+class OnnxEmotionDetector:
+    """SCRFD face detector + FER2013 emotion classifier on ONNX Runtime.
+
+    ``detect_emotions`` returns the same structure as ``FER.detect_emotions``
+    so it can be used as a drop-in replacement for the FER model.
+    """
+
+    def __init__(self, face_model_path, emotion_model_path, use_haar=False):
+        # With use_haar the SCRFD model is not loaded; faces are found on the
+        # grayscale frame with OpenCV's Haar cascade instead.
+        self.use_haar = use_haar
+        if use_haar:
+            self.det_sess = None
+            self._haar = cv2.CascadeClassifier(
+                cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            )
+        else:
+            self.det_sess = _make_session(face_model_path)
+            self._det_input = self.det_sess.get_inputs()[0].name
+
+        self.emo_sess = _make_session(emotion_model_path)
+
+        emo_input = self.emo_sess.get_inputs()[0]
+        self._emo_input = emo_input.name
+
+        # Accept both NCHW (1, 1, H, W) and NHWC (1, H, W, 1) exports
+        shape = emo_input.shape
+        self._emo_nchw = shape[1] == 1
+        self._emo_size = int(shape[2] if self._emo_nchw else shape[1])
+
+        self._anchor_centers = {}
+
+    # -----------------------------
+    # Face Detection (SCRFD)
+    # -----------------------------
+    def _centers(self, stride):
+        if stride not in self._anchor_centers:
+            size = DET_INPUT_SIZE // stride
+            grid = np.stack(np.mgrid[:size, :size][::-1], axis=-1)
+            centers = (grid * stride).reshape(-1, 2).astype(np.float32)
+            self._anchor_centers[stride] = np.repeat(centers, DET_NUM_ANCHORS, axis=0)
+        return self._anchor_centers[stride]
+
+    def _detect_face(self, img):
+        """Return the highest scoring face box as (x, y, w, h), or None."""
+        h, w = img.shape[:2]
+        scale = DET_INPUT_SIZE / max(h, w)
+        resized = cv2.resize(img, (int(w * scale), int(h * scale)))
+
+        canvas = np.zeros((DET_INPUT_SIZE, DET_INPUT_SIZE, 3), dtype=np.uint8)
+        canvas[:resized.shape[0], :resized.shape[1]] = resized
+
+        blob = cv2.dnn.blobFromImage(
+            canvas, 1.0 / 128, (DET_INPUT_SIZE, DET_INPUT_SIZE),
+            (127.5, 127.5, 127.5), swapRB=True
+        )
+        outputs = self.det_sess.run(None, {self._det_input: blob})
+
+        # Outputs are grouped as [scores per stride..., boxes per stride..., (kps...)]
+        n = len(DET_STRIDES)
+        best_score, best_box = DET_SCORE_THRESHOLD, None
+        for i, stride in enumerate(DET_STRIDES):
+            scores = outputs[i].reshape(-1)
+            idx = int(scores.argmax())
+            if scores[idx] < best_score:
+                continue
+            dist = outputs[i + n].reshape(-1, 4)[idx] * stride
+            cx, cy = self._centers(stride)[idx]
+            best_score = scores[idx]
+            best_box = (cx - dist[0], cy - dist[1], cx + dist[2], cy + dist[3])
+
+        if best_box is None:
+            return None
+
+        x1, y1, x2, y2 = (v / scale for v in best_box)
+        x1, y1 = max(int(x1), 0), max(int(y1), 0)
+        x2, y2 = min(int(x2), w), min(int(y2), h)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2 - x1, y2 - y1
+
+    def _detect_face_haar(self, gray):
+        """Return the largest Haar cascade face box as (x, y, w, h), or None."""
+        faces = self._haar.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(40, 40))
+        if len(faces) == 0:
+            return None
+        x, y, w, h = faces[int(np.argmax(faces[:, 2] * faces[:, 3]))]
+        return int(x), int(y), int(w), int(h)
+
+    # -----------------------------
+    # Emotion Classification
+    # -----------------------------
+    def _classify(self, face_gray):
+        face = cv2.resize(face_gray, (self._emo_size, self._emo_size))
+        face = face.astype(np.float32) / 127.5 - 1.0
+        if self._emo_nchw:
+            face = face[np.newaxis, np.newaxis, :, :]
+        else:
+            face = face[np.newaxis, :, :, np.newaxis]
+
+        scores = self.emo_sess.run(None, {self._emo_input: face})[0].reshape(-1)
+        if scores.min() < 0 or not np.isclose(scores.sum(), 1.0, atol=1e-3):
+            scores = _softmax(scores)
+
+        return {label: round(float(s), 2) for label, s in zip(EMOTION_LABELS, scores)}
+
+    def detect_emotions(self, img):
+        if self.use_haar:
+            # Convert once; detection and classification both run on grayscale
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            box = self._detect_face_haar(gray)
+            if box is None:
+                return []
+            x, y, w, h = box
+            face_gray = gray[y:y + h, x:x + w]
+        else:
+            box = self._detect_face(img)
+            if box is None:
+                return []
+            x, y, w, h = box
+            face_gray = cv2.cvtColor(img[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+
+        return [{"box": [x, y, w, h], "emotions": self._classify(face_gray)}]
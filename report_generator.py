@@ -1,35 +1,68 @@
-from datetime import datetime, timedelta, timezone
-from collections import Counter
-from io import BytesIO
-import matplotlib
-matplotlib.use("Agg")
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
 
+from flask import session
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing, String
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.platypus import (
     SimpleDocTemplate,
     Paragraph,
     Spacer,
     Table,
     TableStyle,
-    Image,
     HRFlowable
 )
 
-import matplotlib.pyplot as plt
-import numpy as np
 
+# ---------------------- BEAUTIFUL STYLES ----------------------
+# Styles and chart colors are immutable, so they are built once at import and
+# shared by every report instead of being recreated per render.
+TITLE_STYLE = ParagraphStyle(
+    "Title",
+    fontSize=26,
+    leading=30,
+    alignment=1,
+    textColor=colors.HexColor("#f8170b"),
+    spaceAfter=20,
+    fontName="Helvetica-Bold"
+)
 
-def generate_weekly_report_pdf(user, logs, week_start, week_end, goal=None, recommendation=None):
+SECTION_HEADER = ParagraphStyle(
+    "SectionHeader",
+    fontSize=17,
+    leading=22,
+    textColor=colors.HexColor("#c2185b"),
+    spaceBefore=20,
+    spaceAfter=10,
+    fontName="Helvetica-Bold"
+)
+
+NORMAL = ParagraphStyle(
+    "Normal",
+    fontSize=11,
+    leading=16,
+    textColor=colors.HexColor("#4a4a4a")
+)
+
+PDF_SPOOL_MAX_SIZE = 1024 * 1024  # bytes
 
-    from flask import session
+PIE_COLORS = tuple(colors.HexColor(c) for c in (
+    "#ff6b6b", "#feca57", "#54a0ff",
+    "#5f27cd", "#1dd1a1", "#ff9ff3"
+))
+
+
+def generate_weekly_report_pdf(user, logs, week_start, week_end, goal=None, recommendation=None):
 
     # Retrieve dashboard summary saved from frontend
     summary = session.get("latest_dashboard_summary")
 
-    buffer = BytesIO()
+    # Stays in memory for typical reports, spills to disk past the limit
+    buffer = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
 
     doc = SimpleDocTemplate(
         buffer,
@@ -40,48 +73,11 @@ def generate_weekly_report_pdf(user, logs, week_start, week_end, goal=None, reco
         bottomMargin=40
     )
 
-    styles = getSampleStyleSheet()
-
-    # ---------------------- BEAUTIFUL STYLES ----------------------
-    title_style = ParagraphStyle(
-        "Title",
-        fontSize=26,
-        leading=30,
-        alignment=1,
-        textColor=colors.HexColor("#f8170b"),
-        spaceAfter=20,
-        fontName="Helvetica-Bold"
-    )
-
-    section_header = ParagraphStyle(
-        "SectionHeader",
-        fontSize=17,
-        leading=22,
-        textColor=colors.HexColor("#c2185b"),
-        spaceBefore=20,
-        spaceAfter=10,
-        fontName="Helvetica-Bold"
-    )
-
-    normal = ParagraphStyle(
-        "Normal",
-        fontSize=11,
-        leading=16,
-        textColor=colors.HexColor("#4a4a4a")
-    )
-
-    small = ParagraphStyle(
-        "Small",
-        fontSize=9,
-        leading=13,
-        textColor=colors.HexColor("#777")
-    )
-
     # ---------------------- PDF FLOW ----------------------
     flow = []
 
     # 🌸 TITLE
-    flow.append(Paragraph("🌸 Emotion Detection Report ", title_style))
+    flow.append(Paragraph("🌸 Emotion Detection Report ", TITLE_STYLE))
 
     flow.append(
         HRFlowable(
@@ -98,15 +94,15 @@ def generate_weekly_report_pdf(user, logs, week_start, week_end, goal=None, reco
         f"<b>User:</b> {user.username}<br/>"
         f"<b>Generated:</b> {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"
     )
-    flow.append(Paragraph(meta, normal))
+    flow.append(Paragraph(meta, NORMAL))
     flow.append(Spacer(1, 12))
 
     # 🎀 SECTION: Summary
-    flow.append(Paragraph("💖 Emotion Summary", section_header))
+    flow.append(Paragraph("💖 Emotion Summary", SECTION_HEADER))
 
     # If no summary exists
     if not summary:
-        flow.append(Paragraph("No dashboard summary available.", normal))
+        flow.append(Paragraph("No dashboard summary available.", NORMAL))
 
     else:
         # Build table from summary
@@ -138,51 +134,58 @@ def generate_weekly_report_pdf(user, logs, week_start, week_end, goal=None, reco
         labels = [item["emotion"].capitalize() for item in summary]
         sizes = [item["count"] for item in summary]
 
-        cute_colors = [
-            "#ff6b6b", "#feca57", "#54a0ff",
-            "#5f27cd", "#1dd1a1", "#ff9ff3"
+        # Vector pie drawn straight into the PDF (no raster round-trip)
+        total_count = sum(sizes) or 1
+        drawing = Drawing(300, 300)
+        drawing.add(String(
+            150, 285, "Emotion Distribution (Dashboard Summary)",
+            fontName="Helvetica-Bold", fontSize=11, textAnchor="middle"
+        ))
+
+        pie = Pie()
+        pie.x, pie.y = 50, 30
+        pie.width = pie.height = 200
+        pie.data = sizes
+        pie.labels = [
+            f"{label} ({size / total_count * 100:.1f}%)"
+            for label, size in zip(labels, sizes)
         ]
-
-        fig, ax = plt.subplots(figsize=(4, 4))
-        ax.pie(sizes, labels=labels, autopct="%1.1f%%", colors=cute_colors)
-        ax.set_title("Emotion Distribution (Dashboard Summary)")
-
-        img_buf = BytesIO()
-        plt.savefig(img_buf, format="png", dpi=120, bbox_inches="tight")
-        plt.close(fig)
-        img_buf.seek(0)
-
-        flow.append(Image(img_buf, width=300, height=300))
+        pie.sideLabels = True
+        pie.slices.strokeWidth = 0.5
+        pie.slices.strokeColor = colors.white
+        for i in range(len(sizes)):
+            pie.slices[i].fillColor = PIE_COLORS[i % len(PIE_COLORS)]
+
+        drawing.add(pie)
+        flow.append(drawing)
         flow.append(Spacer(1, 20))
 
     # 🎯 GOAL SECTION — ALWAYS SHOW HAPPY
-    flow.append(Paragraph("🎯 Your Current Goal", section_header))
+    flow.append(Paragraph("🎯 Your Current Goal", SECTION_HEADER))
 
-    flow.append(Paragraph("<b>Target Emotion:</b> happy", normal))
+    flow.append(Paragraph("<b>Target Emotion:</b> happy", NORMAL))
 
     flow.append(Spacer(1, 20))
 
     # 💡 RECOMMENDATION SECTION
-    flow.append(Paragraph("💡 Personalized Recommendation", section_header))
+    flow.append(Paragraph("💡 Personalized Recommendation", SECTION_HEADER))
 
     if recommendation:
-        flow.append(Paragraph(recommendation, normal))
+        flow.append(Paragraph(recommendation, NORMAL))
     else:
-        flow.append(Paragraph("Not enough data for a recommendation.", normal))
+        flow.append(Paragraph("Not enough data for a recommendation.", NORMAL))
 
     flow.append(Spacer(1, 20))
 
     # ⏳ TIMELINE SECTION
-    flow.append(Paragraph("⏳ Recent Emotion Timeline", section_header))
-
-    emotions = [log.emotion for log in logs]
-    total = len(emotions)
+    flow.append(Paragraph("⏳ Recent Emotion Timeline", SECTION_HEADER))
 
-    if total == 0:
-        flow.append(Paragraph("No timeline available.", normal))
+    if not logs:
+        flow.append(Paragraph("No timeline available.", NORMAL))
     else:
+        # logs arrive newest first and already limited to the timeline size
         timeline_data = [["Timestamp", "Emotion", "Confidence"]]
-        for log in sorted(logs, key=lambda x: x.timestamp, reverse=True)[:20]:
+        for log in logs:
             timeline_data.append([
                 log.timestamp.strftime("%H:%M:%S"),
                 log.emotion.capitalize(),
@@ -205,7 +208,11 @@ def generate_weekly_report_pdf(user, logs, week_start, week_end, goal=None, reco
 
         flow.append(timeline_table)
 
-    # Build PDF
-    doc.build(flow)
+    # Build PDF (close the spool on failure; past the limit it's a temp file)
+    try:
+        doc.build(flow)
+    except Exception:
+        buffer.close()
+        raise
     buffer.seek(0)
     return buffer